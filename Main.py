@@ -13,8 +13,12 @@ from RaceDataRetriever import RaceDataRetriever
 from RaceAnalysis import RaceAnalysis
 from RaceStrategySimulator import RaceStrategySimulator
 from Plotting import Plotting
+from concurrent.futures import ThreadPoolExecutor
 import re
 
+# Separators accepted between driver IDs, e.g. 'HAM, VER; 16'
+_DRIVER_SEP = re.compile(r'[,; ]+')
+
 def main():
     while True:
         year, race = get_race_details()
@@ -83,11 +87,11 @@ def validate_data(session, results, lap_data):
 def get_drivers_to_analyze(num_to_abbreviation, abbreviation_to_num):
     while True:
         driver_input = input("\nEnter DriverID(s) to analyze or simulate (e.g., 'HAM' or '44') or type 'all' for all drivers: ").upper()
-        inputted_drivers = re.split('[,; ]+', driver_input.upper())
 
-        if driver_input.lower() == 'all':
+        if driver_input == 'ALL':
             return list(abbreviation_to_num.keys())  # Return all driver abbreviations
         else:
+            inputted_drivers = _DRIVER_SEP.split(driver_input)
             drivers_to_compare = []
             for driver in inputted_drivers:
                 # Convert driver number to abbreviation if necessary
@@ -103,23 +107,31 @@ def get_drivers_to_analyze(num_to_abbreviation, abbreviation_to_num):
 
 
 def analyze_and_print_driver_data(race_analysis, data_retriever, drivers_to_compare, lap_data):
-    for driver_code in drivers_to_compare:
+    # The FastF1 data is only read here, so the drivers can be analyzed side by side
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(drivers_to_compare)))) as executor:
+        performances = list(executor.map(
+            lambda driver_code: race_analysis.analyze_driver_performance(driver_code, data_retriever),
+            drivers_to_compare))
+
+    # Group the stints by driver once for every driver printed below
+    stint_by_driver = race_analysis.stint_data_by_driver(lap_data)
+
+    # Print in the order the drivers were requested
+    for driver_code, driver_performance in zip(drivers_to_compare, performances):
         print(f"\nAnalysis for Driver {driver_code}:")
-        driver_performance = race_analysis.analyze_driver_performance(driver_code, data_retriever)
         if isinstance(driver_performance, dict):
             for key, value in driver_performance.items():
                 print(f"{key}: {value}")
         else:
             print(driver_performance)
-        print_tire_and_compound_data(driver_code, race_analysis, lap_data)
+        print_tire_and_compound_data(driver_code, stint_by_driver)
 
 
 
-def print_tire_and_compound_data(driver_code, race_analysis, lap_data):
-    stint_and_compound_data = race_analysis.analyze_stint_and_compound_data(lap_data)
-    if stint_and_compound_data is not None:
-        driver_stint_data = stint_and_compound_data[stint_and_compound_data['Driver'] == driver_code]
-        if not driver_stint_data.empty:
+def print_tire_and_compound_data(driver_code, stint_by_driver):
+    if stint_by_driver is not None:
+        driver_stint_data = stint_by_driver.get(driver_code)
+        if driver_stint_data is not None and not driver_stint_data.empty:
             print("Tire and Compound Data:")
             print(driver_stint_data.to_string(index=False))
         else:
@@ -144,10 +156,8 @@ def get_race_details():
             if year < 2018:
                 print("Data can only be loaded for years 2018 and onwards. Please enter a valid year.")
                 continue
-            temp_data_retriever = RaceDataRetriever(year, None)
-            
             # Fetch the race calendar for the year and display it
-            calendar = temp_data_retriever.get_race_calendar()
+            calendar = RaceDataRetriever.get_race_calendar(year)
             if calendar is not None:
                 print("\nHere are the races for the selected year:")
                 print(calendar.to_string(index=False))
@@ -5,6 +5,8 @@ warnings.simplefilter("ignore")
 import numpy as np
 import matplotlib as mpl
 from matplotlib import pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.transforms import Affine2D
 
 import fastf1 as ff1
 from fastf1 import plotting
@@ -13,6 +15,9 @@ from RaceAnalysis import RaceAnalysis
 
 
 class Plotting:
+    # Precomputed track map points shared by every plotter, keyed by (year, race)
+    _map_cache = {}
+
     def __init__(self, year, race):
         self.year = year
         self.race = race
@@ -48,55 +53,61 @@ class Plotting:
 
         if self.lap_data is not None and self.drivers is not None:
             legend_entries = []  # Stores the legend handles
-            existing_labels = [] # Keeps track of compounds already stored
+            existing_labels = set() # Keeps track of compounds already stored
+
+            # Split the stints by driver once instead of filtering per driver
+            stints_by_driver = dict(tuple(self.lap_data.groupby("Driver", sort=False, observed=True)))
 
             for driver in self.drivers:
-                driver_stints = self.lap_data.loc[self.lap_data["Driver"] == driver]
-                previous_stint_end = 0
-                for _, row in driver_stints.iterrows():
-                    stint_length = row['StintLength']
-                    compound = row['Compound']
-                    color = plotting.COMPOUND_COLORS.get(row["Compound"], "grey")
-                    # Bars
-                    ax.barh(
-                        y = driver,
-                        width = stint_length,
-                        left = previous_stint_end,
-                        color = color,
-                        edgecolor = "black",
-                        fill = True
-                    )
-                    previous_stint_end += stint_length
-
-                    # Key/Legend for tyre compound color
-                    # Create a legend entry if compound is not already in the legend
+                driver_stints = stints_by_driver.get(driver)
+                if driver_stints is None:
+                    continue
+                stint_lengths = driver_stints['StintLength'].to_numpy()
+                compounds = driver_stints['Compound'].to_numpy()
+                # Each stint starts where the previous one ended
+                stint_starts = np.concatenate(([0], stint_lengths.cumsum()[:-1]))
+                colors = [plotting.COMPOUND_COLORS.get(compound, "grey") for compound in compounds]
+                # Bars
+                ax.barh(
+                    y = [driver] * len(stint_lengths),
+                    width = stint_lengths,
+                    left = stint_starts,
+                    color = colors,
+                    edgecolor = "black",
+                    fill = True
+                )
+
+                # Key/Legend for tyre compound color
+                # Create a legend entry if compound is not already in the legend
+                for compound, color in zip(compounds, colors):
                     if compound not in existing_labels:
                         legend_entry = mpl.patches.Patch(color=color, label=compound)
                         legend_entries.append(legend_entry)
-                        existing_labels.append(compound)
+                        existing_labels.add(compound)
             
             if simulated_strategy and driver_code:
                 sim_driver = f"SIM {driver_code}"  # Use the driver abbreviation for the simulated strategy
-                previous_stint_end = 0
-                for stint in simulated_strategy:
-                    compound, stint_length = stint
-                    color = plotting.COMPOUND_COLORS.get(compound.upper(), "grey")
-                    # Simulated Bars
-                    ax.barh(
-                        y = sim_driver,
-                        width = stint_length,
-                        left = previous_stint_end,
-                        color = color,
-                        edgecolor = "black",
-                        hatch = '//',
-                        fill = True
-                    )
-                    previous_stint_end += stint_length
-
-                    if compound.upper() not in existing_labels:
-                        legend_entry = mpl.patches.Patch(color=color, label=compound.upper(), hatch='//')
+                compounds = [compound.upper() for compound, _ in simulated_strategy]
+                stint_lengths = np.array([stint_length for _, stint_length in simulated_strategy])
+                # Each stint starts where the previous one ended
+                stint_starts = np.concatenate(([0], stint_lengths.cumsum()[:-1]))
+                colors = [plotting.COMPOUND_COLORS.get(compound, "grey") for compound in compounds]
+                # Simulated Bars
+                ax.barh(
+                    y = [sim_driver] * len(stint_lengths),
+                    width = stint_lengths,
+                    left = stint_starts,
+                    color = colors,
+                    edgecolor = "black",
+                    hatch = '//',
+                    fill = True
+                )
+
+                for compound, color in zip(compounds, colors):
+                    if compound not in existing_labels:
+                        legend_entry = mpl.patches.Patch(color=color, label=compound, hatch='//')
                         legend_entries.append(legend_entry)
-                        existing_labels.append(compound.upper())
+                        existing_labels.add(compound)
                         
 
             # invert the y-axis so drivers that finish higher are closer to the top
@@ -119,7 +130,48 @@ class Plotting:
     
     def draw_map_visual(self):
         #self.load_and_initialize_data()
+        map_data = self.get_map_data()
+        if map_data is None:
+            return
+        track, text_xy, corner_xy, labels, track_angle, event_name = map_data
+
+        # Let matplotlib rotate every point while drawing instead of rotating the arrays
+        ax = plt.gca()
+        rotation = Affine2D().rotate(track_angle) + ax.transData
+
+        # Plot the track map
+        plt.plot(track[:, 0], track[:, 1], transform=rotation)
+
+        # Draw a line from the track to the circle for every corner at once
+        segments = np.stack([corner_xy, text_xy], axis=1)
+        ax.add_collection(LineCollection(segments, colors='grey', transform=rotation))
+
+        # Draw a circle next to the track for every corner at once
+        ax.scatter(text_xy[:, 0], text_xy[:, 1], color='grey', s=140, transform=rotation)
+
+        # Print the corner number inside each circle
+        for (text_x, text_y), txt in zip(text_xy, labels):
+            plt.text(text_x, text_y, txt, transform=rotation,
+                     va='center_baseline', ha='center', size='small', color='white')
+            
+        plt.title(f"{event_name} {self.year}")
+        plt.xticks([])
+        plt.yticks([])
+        plt.axis('equal')
+        plt.show(block=False)
+
+
+
+    # Extracts the track and corner positions, reusing earlier results for the same race
+    def get_map_data(self):
+        key = (self.year, self.race)
+        if key in self._map_cache:
+            return self._map_cache[key]
+
         session = self.data_retriever.load_session()
+        if session is None:
+            print("Race data could not be initialized.")
+            return None
         lap = session.laps.pick_fastest()
         pos = lap.get_pos_data()
         circuit_info = session.get_circuit_info()
@@ -131,56 +183,23 @@ class Plotting:
         # Convert rotation angle from degrees to radian
         track_angle = circuit_info.rotation / 180 * np.pi
 
-        # Rotate and plot the track map
-        rotated_track = self.rotate(track, angle=track_angle)
-        plt.plot(rotated_track[:, 0], rotated_track[:, 1])
-
-        offset_vector = [500, 0]
-
-        # Iterate over all corners
-        for _, corner in circuit_info.corners.iterrows():
-            # Create string from corner number and letter
-            txt = f"{corner['Number']}{corner['Letter']}"
-
-            # Convert angle from degrees to radian
-            offset_angle = corner['Angle'] / 180 * np.pi
-
-            # Rotate offset vector so it points sideways from track
-            offset_x, offset_y = self.rotate(offset_vector, angle=offset_angle)
-
-            # Add offset to the position of the corner
-            text_x = corner['X'] + offset_x
-            text_y = corner['Y'] + offset_y
-
-            # Rotate text position equivalently to the rest of the track map
-            text_x, text_y = self.rotate([text_x, text_y], angle=track_angle)
+        corners = circuit_info.corners
+        corner_xy = corners[['X', 'Y']].to_numpy()
 
-            # Rotate center of corner equivalently to rest of the track map
-            track_x, track_y = self.rotate([corner['X'], corner['Y']], angle=track_angle)
+        # Convert angles from degrees to radian
+        offset_angles = corners['Angle'].to_numpy() / 180 * np.pi
 
-            # Draw a circle next to the track
-            plt.scatter(text_x, text_y, color='grey', s=140)
-
-            # Draw a line from the track to the circle
-            plt.plot([track_x, text_x], [track_y, text_y], color='grey')
-
-            # Print the corner number inside the circle
-            plt.text(text_x, text_y, txt,
-                     va='center_baseline', ha='center', size='small', color='white')
-            
-        plt.title(f"{session.event['EventName']} {self.year}")
-        plt.xticks([])
-        plt.yticks([])
-        plt.axis('equal')
-        plt.show(block=False)
+        # Rotate the [500, 0] offset vector so it points sideways from track
+        offsets = np.stack([500 * np.cos(offset_angles), 500 * np.sin(offset_angles)], axis=1)
 
+        # Add offset to the position of the corner
+        text_xy = corner_xy + offsets
 
+        # Create strings from corner number and letter
+        labels = [f"{number}{letter}" for number, letter in zip(corners['Number'], corners['Letter'])]
 
-    # Helper function for rotating points around origin of coordinate system
-    def rotate(self, xy, *, angle):
-        rot_mat = np.array([[np.cos(angle), np.sin(angle)],
-                        [-np.sin(angle), np.cos(angle)]])
-        return np.matmul(xy, rot_mat)
+        self._map_cache[key] = (track, text_xy, corner_xy, labels, track_angle, session.event['EventName'])
+        return self._map_cache[key]
 
 
 
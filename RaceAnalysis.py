@@ -7,11 +7,47 @@
 """
 import pandas as pd
 
+
+# Format seconds as HH:MM:SS.mmm without going through Timedelta
+def format_seconds(sec):
+    if pd.isnull(sec):
+        return 'NaT'
+    total_ms = int(round(sec * 1000))
+    hours, rem = divmod(total_ms, 3600000)
+    minutes, rem = divmod(rem, 60000)
+    seconds, ms = divmod(rem, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{ms:03d}"
+
+
+# Format a Timedelta as HH:MM:SS.mmm, dropping the 'days' part str() would add
+def _fmt_td(t):
+    if isinstance(t, pd.Timedelta):
+        return format_seconds(t.total_seconds())
+    if not pd.isnull(t):
+        return str(t).split('days')[-1].strip()
+    return t
+
+
 class RaceAnalysis:
     def __init__(self, results):
         self.results = results
+        self._stint_cache = {}
+        self._stint_by_driver = {}
+        self._stint_table_cache = {}
+        self._race_time_cache = {}
+        # Row positions of each driver's result so lookups don't scan the results frame
+        self._by_abbr = self._index_results_by('Abbreviation')
+        self._by_pos = self._index_results_by('Position')
+        self._winner_row = self.get_driver_position(1)
         
 
+    def _index_results_by(self, column):
+        try:
+            return dict(zip(self.results[column], range(len(self.results))))
+        except KeyError:
+            return {}
+
+
     # Calls other methods to performancee specirfic tasks to create the performance analysis for drivers
     def analyze_driver_performance(self, driver_code, race_data_retriever):
         # Grab race results for the given driver
@@ -30,18 +66,13 @@ class RaceAnalysis:
 
     # Helper method to retrive race results for specific drivers.
     def get_driver_results(self, driver_code):
-        try:
-            driver_result = self.results.loc[self.results['Abbreviation'] == driver_code]
-            return driver_result.iloc[0] if not driver_result.empty else None
-        except KeyError:
-            return None
+        row = self._by_abbr.get(driver_code)
+        return self.results.iloc[row] if row is not None else None
         
 
     def format_driver_performance(self, driver_result):
         # Format time to not be TimeDelta
-        time_str = driver_result.get('Time', pd.NaT)
-        if not pd.isnull(time_str):
-            time_str = str(time_str).split('days')[-1].strip()
+        time_str = _fmt_td(driver_result.get('Time', pd.NaT))
 
         return {
             'Driver': driver_result.get('Abbreviation', 'N/A'),
@@ -53,21 +84,56 @@ class RaceAnalysis:
         }
     
 
-    def analyze_stint_and_compound_data(self, laps):
+    def analyze_stint_and_compound_data(self, laps, driver_filter=None):
         if laps is not None:    
+            # The laps frame is held by the data retriever, so its id is stable between calls
+            key = (id(laps), driver_filter)
+            if key in self._stint_cache:
+                return self._stint_cache[key]
+            all_laps = laps
+            # Only group the laps that are needed when a single driver is requested
+            if driver_filter is not None:
+                laps = laps[laps['Driver'] == driver_filter]
             stints = laps[['Driver', 'Stint', 'Compound', 'LapNumber']].dropna()
-            stints = stints.groupby(['Driver', 'Stint', 'Compound'])
-            stints = stints.count().reset_index()
-            stints = stints.rename(columns={'LapNumber': 'StintLength'})
+            # Group on category codes instead of hashing the strings on every row
+            stints = stints.assign(Driver=stints['Driver'].astype('category'),
+                                   Compound=stints['Compound'].astype('category'))
+            stints = stints.groupby(['Driver', 'Stint', 'Compound'], sort=False, observed=True)
+            stints = stints.size().reset_index(name='StintLength')
+            self._stint_cache[key] = stints
+            if driver_filter is None:
+                self._stint_by_driver[id(all_laps)] = {driver: group for driver, group in stints.groupby('Driver', sort=False, observed=True)}
             return stints
         return None
+
+
+    # Stint data split by driver so callers can look a driver up without filtering
+    def stint_data_by_driver(self, laps):
+        if self.analyze_stint_and_compound_data(laps) is None:
+            return None
+        return self._stint_by_driver[id(laps)]
+
+
+    # A driver's stints keyed by stint number as (compound, stint length), built once per driver
+    def get_driver_stint_table(self, laps, driver_code):
+        key = (id(laps), driver_code)
+        if key not in self._stint_table_cache:
+            stints = self.analyze_stint_and_compound_data(laps, driver_filter=driver_code)
+            stint_table = {}
+            if stints is not None:
+                for stint, compound, length in zip(stints['Stint'].to_numpy(),
+                                                   stints['Compound'].to_numpy(),
+                                                   stints['StintLength'].to_numpy()):
+                    stint_table.setdefault(stint, (compound, length))
+            self._stint_table_cache[key] = stint_table
+        return self._stint_table_cache[key]
     
 
     def analyze_fastest_lap(self, driver_code, race_data_retriever):
         fastest_lap_time, top_speed = race_data_retriever.get_fastest_lap_data(driver_code)
         if fastest_lap_time is not None:
             # Remove the 'days' part if present
-            fastest_lap_str = str(fastest_lap_time).split('days')[-1].strip()
+            fastest_lap_str = _fmt_td(fastest_lap_time)
             return {
                 'Fastest Lap Time': fastest_lap_str,
                 'Top Speed during Fastest Lap': f"{top_speed} km/h" if top_speed else 'N/A'
@@ -97,9 +163,9 @@ class RaceAnalysis:
         for key, value in winner_fastest_lap_performance.items():
             print(f"{key}: {value}")
 
-        winner_stint_and_compound = self.analyze_stint_and_compound_data(race_data_retriever.get_lap_data())
-        winner_stint_data = winner_stint_and_compound[winner_stint_and_compound['Driver'] == winner_result['Abbreviation']]
-        if not winner_stint_data.empty:
+        winner_stint_data = self.analyze_stint_and_compound_data(race_data_retriever.get_lap_data(),
+                                                                 driver_filter=winner_result['Abbreviation'])
+        if winner_stint_data is not None and not winner_stint_data.empty:
             print(winner_stint_data.to_string(index=False))
         else:
             print("No tire and compound data available for the winner.")
@@ -107,17 +173,14 @@ class RaceAnalysis:
 
     # Helper method to find the position of each driver
     def get_driver_position(self, position):
-        try:
-            driver_result = self.results.loc[self.results['Position'] == position]
-            return driver_result.iloc[0] if not driver_result.empty else None
-        except KeyError:
-            return None
+        row = self._by_pos.get(position)
+        return self.results.iloc[row] if row is not None else None
         
 
     def get_driver_race_time(self, driver_code):
-        # Session's winner data
-        winner_data = self.results[self.results['Position'] == 1].iloc[0]
-        winner_code = winner_data['Abbreviation']
+        if driver_code in self._race_time_cache:
+            return self._race_time_cache[driver_code]
+
         # Get the winner's total race time
         winner_race_time = self.get_winner_race_time()
 
@@ -125,16 +188,20 @@ class RaceAnalysis:
             print("Cannot determine the actual race time without the winner's time.")
             return None
         
+        # Session's winner data
+        winner_code = self._winner_row['Abbreviation']
         if driver_code == winner_code:
+            self._race_time_cache[driver_code] = winner_race_time
             return winner_race_time
         else:
-            driver_results = self.results[self.results['Abbreviation'] == driver_code]
-            if not driver_results.empty:
-                time_behind_str = driver_results.iloc[0]['Time']
+            driver_results = self.get_driver_results(driver_code)
+            if driver_results is not None:
+                time_behind_str = driver_results['Time']
                 try:
                     time_behind = pd.to_timedelta(time_behind_str)
                     # Calculate the total race time for the driver
                     total_race_time = winner_race_time + time_behind
+                    self._race_time_cache[driver_code] = total_race_time
                     return total_race_time
                 except ValueError:
                     print(f"Race time data is invalid for driver code '{driver_code}'.")
@@ -145,9 +212,8 @@ class RaceAnalysis:
         
 
     def get_winner_race_time(self):
-        winner_results = self.results[self.results['Position'] == 1]
-        if not winner_results.empty:
-            winner_time_str = winner_results.iloc[0]['Time']
+        if self._winner_row is not None:
+            winner_time_str = self._winner_row['Time']
             try:
                 winner_time = pd.to_timedelta(winner_time_str)
                 return winner_time
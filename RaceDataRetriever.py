@@ -7,30 +7,55 @@
 """
 import fastf1 as ff1
 from fastf1.core import Session
+from functools import lru_cache
 import os
 
 
+# Race calendars don't change during a run, so fetch each year only once
+@lru_cache(maxsize=16)
+def _calendar_for(year):
+    calendar = ff1.get_event_schedule(year)
+    return calendar[['RoundNumber', 'EventName', 'Country', 'Location']]
+
+
 class RaceDataRetriever:
+    # Loaded sessions shared by every retriever, keyed by (year, race)
+    _session_cache = {}
+    # FastF1's cache is process wide, so it only has to be enabled once
+    cache_dir = './fastf1_cache'
+    _cache_enabled = False
+
     def __init__(self, year, race):
-        self.cache_dir = './fastf1_cache'
         self.year = year
         self.race = race
-        self.session = None
+        self.session = self._session_cache.get((year, race))
+        self.results = None
+        self.laps = None
         self.num_to_abbreviation = None
         self.abbreviation_to_num = None
+        self._fastest_cache = {}
         self._setup_cache()
         
         
-    def _setup_cache(self):
-        if not os.path.exists(self.cache_dir):
-            os.makedirs(self.cache_dir)
-        ff1.Cache.enable_cache(self.cache_dir) # Enable cache
+    @classmethod
+    def _setup_cache(cls):
+        if cls._cache_enabled:
+            return
+        if not os.path.exists(cls.cache_dir):
+            os.makedirs(cls.cache_dir)
+        ff1.Cache.enable_cache(cls.cache_dir) # Enable cache
+        cls._cache_enabled = True
 
          
     def load_session(self):
+        key = (self.year, self.race)
+        if key in self._session_cache:
+            self.session = self._session_cache[key]
+            return self.session
         try:
             self.session = ff1.get_session(self.year, self.race, 'R')
             self.session.load()
+            self._session_cache[key] = self.session
             return self.session
         except Exception as e:
             print(f"An error occurred while loading the session: {e}")
@@ -38,9 +63,12 @@ class RaceDataRetriever:
 
 
     def get_race_data(self):
+        if self.results is not None:
+            return self.results
         if self.session:
             try:
-                return self.session.results
+                self.results = self.session.results
+                return self.results
             except ff1.core.DataNotLoadedError as e:
                 print(f"The data you are trying to access has not been loaded yet. Error: {e}")
                 return None
@@ -53,9 +81,12 @@ class RaceDataRetriever:
 
 
     def get_lap_data(self):
+        if self.laps is not None:
+            return self.laps
         if self.session:
             try:
-                return self.session.laps
+                self.laps = self.session.laps
+                return self.laps
             except ff1.core.DataNotLoadedError as e:
                 print(f"The data you are trying to access has not been loaded yet. Error: {e}")
                 return None
@@ -67,10 +98,12 @@ class RaceDataRetriever:
             return None
         
     
-    def get_race_calendar(self):
+    # Doesn't need a race, so it can be called without creating a retriever
+    @classmethod
+    def get_race_calendar(cls, year):
+        cls._setup_cache()
         try:
-            calendar = ff1.get_event_schedule(self.year)
-            return calendar[['RoundNumber', 'EventName', 'Country', 'Location']]
+            return _calendar_for(year)
         except Exception as e:
             print(f"An error occurred while fetching the race calendar: {e}")
             return None
@@ -78,6 +111,10 @@ class RaceDataRetriever:
     
     def get_fastest_lap_data(self, driver_code):
         if self.session:
+            # Keyed on the session object so a reloaded session is decoded again
+            key = (id(self.session), driver_code)
+            if key in self._fastest_cache:
+                return self._fastest_cache[key]
             try:
                 fastest_lap = self.session.laps.pick_driver(driver_code).pick_fastest()
                 if not fastest_lap.empty:     
@@ -85,14 +122,15 @@ class RaceDataRetriever:
                     telemetry = fastest_lap.get_telemetry()
                     if telemetry is not None:
                         top_speed = telemetry['Speed'].max()
+                        self._fastest_cache[key] = (fastest_lap_time, top_speed)
                         return fastest_lap_time, top_speed
                 else:
                     return fastest_lap_time, None
             except ff1.core.DataNotLoadedError as e:
-                print(f"Fastest lap data cannot be loaded. Error: {e}")
+                print(f"Fastest lap data cannot be loaded for driver {driver_code}. Error: {e}")
                 return None, None
             except Exception as e:
-                print(f"An error occurred while fetching fastest lap data: {e}")
+                print(f"An error occurred while fetching fastest lap data for driver {driver_code}: {e}")
                 return None, None
         else:
             print("Session is not initialized.")
@@ -103,8 +141,11 @@ class RaceDataRetriever:
     def create_driver_mappings(self, results):
         if self.session and hasattr(self.session, 'results'):
             #results = self.session.results
-            self.num_to_abbreviation = {str(row['DriverNumber']): row['Abbreviation'] for _, row in results.iterrows()}
-            self.abbreviation_to_num = {row['Abbreviation']: str(row['DriverNumber']) for _, row in results.iterrows()}
+            # Cast the whole column in one vectorized step rather than str() per row
+            nums = results['DriverNumber'].astype('string').to_numpy()
+            abbs = results['Abbreviation'].to_numpy()
+            self.num_to_abbreviation = dict(zip(nums, abbs))
+            self.abbreviation_to_num = dict(zip(abbs, nums))
             return self.num_to_abbreviation, self.abbreviation_to_num
         else:
             self.num_to_abbreviation = {}
@@ -114,8 +155,6 @@ class RaceDataRetriever:
 
     def display_driver_mappings(self, num_to_abbreviation):
         self.num_to_abbreviation = num_to_abbreviation
-        print("\nDriver Number and Abbreviations:")
-        print(f"{'Number':<10} | {'Abbreviation'}")
-        print("-" * 25)
-        for number, abbreviation in self.num_to_abbreviation.items():
-            print(f"{number:<10} | {abbreviation}")
\ No newline at end of file
+        # Build the whole table first so it is written with a single print
+        lines = [f"{number:<10} | {abbreviation}" for number, abbreviation in self.num_to_abbreviation.items()]
+        print("\n".join(["\nDriver Number and Abbreviations:", f"{'Number':<10} | {'Abbreviation'}", "-" * 25, *lines]))
\ No newline at end of file
@@ -9,28 +9,65 @@
 """
 import numpy as np
 from RaceDataRetriever import RaceDataRetriever
-from RaceAnalysis import RaceAnalysis
+from RaceAnalysis import RaceAnalysis, format_seconds
 from Plotting import Plotting
 import pandas as pd
 
+# Numba is optional, without it large batches are simulated with NumPy alone
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+# Tyre compounds a strategy can use, lap data compounds are stored with this dtype
+COMPOUND_DTYPE = pd.CategoricalDtype(['SOFT', 'MEDIUM', 'HARD', 'WET', 'INTERMEDIATE'])
+
+
+# Below this many simulated laps NumPy is faster than compiling the Numba kernel
+_NUMBA_MIN_SIZE = 100_000
+
+# Most replications a user can ask for, 100,000 x 78 laps is about 60 MB of lap times
+_MAX_SIMULATIONS = 100_000
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _simulate(base, n_reps):
+        # Each prange thread draws from its own Numba generator, so the kernel is not seeded
+        total_laps = base.size
+        out = np.empty((n_reps, total_laps))
+        for i in prange(n_reps):
+            for j in range(total_laps):
+                b = base[j]
+                # Deviation up to +/- 0.05% of the base lap time
+                out[i, j] = b + b * np.random.uniform(-0.005, 0.005)
+        return out
+
+
 class RaceStrategySimulator:
+    # Position of each compound in COMPOUND_DTYPE, used to index per compound arrays and
+    # as the compounds a strategy may use
+    _COMPOUND_CODES = {compound: code for code, compound in enumerate(COMPOUND_DTYPE.categories)}
+
     def __init__(self, year, race):
         self.year = year
         self.race = race
         self.data_retriever = RaceDataRetriever(year, race)
         self.analysis = None
-        self.user_strategy = []
-        self.simulated_lap_times = []  # To store simulated lap times based on user strategy.
+        self.user_strategy = []  # (compound, laps) per stint, kept for display
+        # The user strategy as parallel arrays of compound codes and lap counts for the simulation
+        self._strategy_codes = np.empty(0, dtype=np.int8)
+        self._strategy_laps = np.empty(0, dtype=np.int64)
+        self.simulated_lap_times = np.empty(0, dtype=np.float64)  # To store simulated lap times (seconds) based on user strategy.
+        self.simulated_race_times = np.empty(0, dtype=np.float64)  # Total race time (seconds) of each simulated replication
         self.total_laps = 0
         self.driver_code = None
-        # for when we cant find averages of a compound
-        self.compound_performance_factor = {
-            'SOFT': 1.018,
-            'MEDIUM': 1.038,
-            'HARD': 1.058,
-            'WET': 1.098,
-            'INTERMEDIATE': 1.078
-        }
+        self._lap_data = None
+        self._driver_lap_counts = None  # Number of laps completed by each driver
+        self._lap_data_by_driver = None  # Lap data indexed by driver for direct lookups
+        self._compound_averages = {}  # Per driver average lap time (seconds) for each compound
+        self._field_average = None  # Average lap time (seconds) of the whole field
+        self._rng = np.random.default_rng()
 
 
     def load_and_initialize_data(self):
@@ -40,6 +77,22 @@ class RaceStrategySimulator:
             self.total_laps = session.laps['LapNumber'].max()
         else:
             print("Race data could not be initialized.")
+
+
+    # Lap data is fetched on first use and reused afterwards
+    @property
+    def lap_data(self):
+        if self._lap_data is None:
+            lap_data = self.data_retriever.get_lap_data()
+            if lap_data is not None:
+                # Convert lap times to float seconds and compounds to categories once,
+                # so averages avoid Timedelta arithmetic and string comparisons
+                lap_data = lap_data.assign(LapTimeSec=lap_data['LapTime'].dt.total_seconds(),
+                                           Compound=lap_data['Compound'].str.upper().astype(COMPOUND_DTYPE))
+                self._driver_lap_counts = lap_data['Driver'].value_counts()
+                self._lap_data_by_driver = lap_data.set_index('Driver', drop=False).sort_index()
+            self._lap_data = lap_data
+        return self._lap_data
         
 
     def input_strategy(self):
@@ -59,13 +112,18 @@ class RaceStrategySimulator:
                         print("\nCompound options:\nSoft\nMedium\nHard\nWet\nIntermediate")
                         stint_info = input(f"Enter compound and laps for stint {stint_num} (e.g., 'Soft 20'): ")
                         compound, laps = stint_info.split()
+                        compound = compound.upper()
                         laps = int(laps)
 
+                        if compound not in self._COMPOUND_CODES:
+                            print("Unknown compound. Please choose one of the listed compounds.")
+                            continue
+
                         if laps <= 0:
                             print("Number of laps must be greater than zero. Please try again.")
                             continue
 
-                        self.user_strategy.append((compound.upper(), laps))
+                        self.user_strategy.append((compound, laps))
                         break  # Break inner loop when a valid stint is entered
 
                 total_strategy_laps = sum(laps for _, laps in self.user_strategy)
@@ -74,6 +132,7 @@ class RaceStrategySimulator:
                     print("Please revise your strategy.")
                 else:
                     print("\nStrategy accepted.")
+                    self._set_strategy_arrays()
                     break  # Break outer loop when the total strategy is valid
 
             except ValueError:
@@ -82,116 +141,153 @@ class RaceStrategySimulator:
                 print("Invalid format. Please use the format 'Compound Laps' for your strategy.")
 
 
+    def input_num_simulations(self, default=1000):
+        # More simulations give a steadier average, large batches run in the Numba kernel when it is installed
+        while True:
+            user_input = input(f"\nHow many race simulations do you want to run? (1-{_MAX_SIMULATIONS}, press Enter for {default}): ").strip()
+            if not user_input:
+                return default
+            try:
+                n_reps = int(user_input)
+            except ValueError:
+                print("Invalid input. Please enter a whole number.")
+                continue
+            if n_reps <= 0:
+                print("Number of simulations must be greater than zero. Please try again.")
+                continue
+            if n_reps > _MAX_SIMULATIONS:
+                print(f"Number of simulations can be at most {_MAX_SIMULATIONS}. Please try again.")
+                continue
+            return n_reps
+
+
+    def _set_strategy_arrays(self):
+        self._strategy_codes = np.array([self._COMPOUND_CODES[compound] for compound, _ in self.user_strategy],
+                                        dtype=np.int8)
+        self._strategy_laps = np.array([laps for _, laps in self.user_strategy], dtype=np.int64)
+
+
     # Check if the driver finishes the full race or not
     def did_driver_finish(self, driver_code):
-        # Ensure lap data is loaded
-        if not hasattr(self.data_retriever, 'lap_data'):
-            self.data_retriever.lap_data = self.data_retriever.get_lap_data()
-        driver_laps = self.data_retriever.lap_data[self.data_retriever.lap_data['Driver'] == driver_code]
-        return len(driver_laps) == self.total_laps
+        if self.lap_data is None:
+            return False
+        return self._driver_lap_counts.get(driver_code, 0) == self.total_laps
 
 
     def calculate_driver_averages(self, driver_code):
-        # Check if lap data is loaded
-        if not hasattr(self.data_retriever, 'lap_data'):
-            self.data_retriever.lap_data = self.data_retriever.get_lap_data()
+        lap_data = self.lap_data
 
-        lap_data = self.data_retriever.get_lap_data()
+        # Average every compound the driver used in one pass, once per driver
+        if driver_code not in self._compound_averages:
+            if driver_code in self._driver_lap_counts:
+                driver_rows = self._lap_data_by_driver.loc[[driver_code], ['Compound', 'LapTimeSec']]
+            else:
+                driver_rows = lap_data.iloc[:0][['Compound', 'LapTimeSec']]
+            # Laps without a time are left out, a compound with no timed laps uses the field average
+            driver_rows = driver_rows.dropna(subset=['LapTimeSec'])
+            self._compound_averages[driver_code] = driver_rows.groupby('Compound', observed=True)['LapTimeSec'].mean().to_dict()
+        compound_means = self._compound_averages[driver_code]
 
         driver_averages = {}
+        # Strategy compounds are upper cased when entered, matching the lap data categories
         for compound, _ in self.user_strategy:
-            compound_upper = compound.upper()
-            compound_laps = lap_data[(lap_data['Driver'] == driver_code) & 
-                                    (lap_data['Compound'].str.upper() == compound_upper)]
-
-            if not compound_laps.empty:
-                driver_averages[compound_upper] = compound_laps['LapTime'].mean().total_seconds()
+            if compound in compound_means:
+                driver_averages[compound] = compound_means[compound]
             else:
-                print(f"No data for {compound_upper}, using average lap time.")
-                driver_averages[compound_upper] = lap_data['LapTime'].mean().total_seconds()
+                print(f"No data for {compound}, using average lap time.")
+                if self._field_average is None:
+                    self._field_average = lap_data['LapTimeSec'].mean()
+                driver_averages[compound] = self._field_average
 
         return driver_averages
 
 
-    def simulate_lap_times(self, driver_code):
+    # Builds the base lap time of every lap in the user strategy
+    def build_per_lap_arrays(self, driver_code):
+        driver_averages = self.calculate_driver_averages(driver_code)
+
+        # Average lap time of every compound, indexed by compound code. Every strategy compound
+        # has an average since input_strategy only accepts known compounds, compounds the
+        # driver never ran use the field average.
+        code_base = np.array([driver_averages.get(compound, np.nan) for compound in COMPOUND_DTYPE.categories],
+                             dtype=np.float64)
+
+        # Expand the stints to one entry per lap
+        return np.repeat(code_base[self._strategy_codes], self._strategy_laps)
+
+
+    # Simulates the race n_reps times at once, returning one row of lap times (seconds) per replication
+    def simulate_lap_times_batch(self, driver_code, n_reps=1000):
         if not self.did_driver_finish(driver_code):
             print(f"Driver {driver_code} did not finish the race and cannot be used for simulation.")
-            return []
+            return np.empty((0, 0), dtype=np.float64)
 
-        driver_averages = self.calculate_driver_averages(driver_code)
-        simulated_times = []
-        for compound, laps in self.user_strategy:
-            compound_upper = compound.upper()
-            if compound_upper in driver_averages:
-                base_lap_time = driver_averages[compound_upper]
-                #compound_factor = self.compound_performance_factor[compound_upper]
-
-                for _ in range(laps):
-                    # Introduce deviation up to +/- 0.05% of the base lap time
-                    deviation = np.random.uniform(-0.005, 0.005) * base_lap_time
-                    lap_time_with_deviation = base_lap_time + deviation
-                                               #* compound_factor) 
-                    simulated_times.append(pd.Timedelta(seconds=lap_time_with_deviation))
-            else:
-                print(f"No average lap time found for compound '{compound_upper}'. Using default value.")
-                for _ in range(laps):
-                    # Introduce deviation up to +/- 0.05% of the default lap time (90 seconds in this case)
-                    deviation = np.random.uniform(-0.005, 0.005) * 90
-                    simulated_times.append(pd.Timedelta(seconds=90 + deviation))
-        return simulated_times
+        per_lap_base = self.build_per_lap_arrays(driver_code)
+
+        # Large batches run in a compiled kernel that draws the deviations lap by lap in parallel
+        if njit is not None and n_reps * per_lap_base.size >= _NUMBA_MIN_SIZE:
+            return _simulate(per_lap_base, n_reps)
+
+        # Draw the deviations of every lap of every replication in one call, then turn that
+        # buffer into the lap matrix in place so only one (n_reps, laps) array is allocated
+        lap_matrix = self._rng.uniform(-0.005, 0.005, size=(n_reps, per_lap_base.size))
+        np.multiply(lap_matrix, per_lap_base, out=lap_matrix)
+        np.add(lap_matrix, per_lap_base, out=lap_matrix)
+        return lap_matrix
 
 
     def compare_strategy(self, driver_code):
         # Retrieve the actual race data for the specified driver
         actual_race_time = self.analysis.get_driver_race_time(driver_code)
-        # Calculate the total simulated race time
-        total_simulated_time = sum(self.simulated_lap_times, pd.Timedelta(0))
-
-        # Get actual stint and compound data for the driver for comparison
-        actual_stint_data = self.analysis.analyze_stint_and_compound_data(self.data_retriever.get_lap_data())
-        actual_stint_data = actual_stint_data[actual_stint_data['Driver'] == driver_code]
+        if actual_race_time is None or pd.isnull(actual_race_time):
+            print(f"No actual race time found for driver {driver_code}.")
+            return
 
-        max_stints = max(actual_stint_data['Stint'].max(), len(self.user_strategy))
+        # Calculate the total simulated race time, averaged over the replications
+        race_totals = self.simulated_race_times
+        total_simulated_seconds = race_totals.mean()
+        spread_seconds = race_totals.std()
 
-        # Format
-        actual_race_time_str = str(actual_race_time).split(' days ')[-1]  # This will take the time part after ' days '
-        total_simulated_time_str = str(total_simulated_time).split(' days ')[-1]  # Same for the simulated time
-        
-        if actual_race_time is not None:
-            # Print the side by side comparison of stints
-            print("\nStint | Actual Compound (Laps) | Simulated Compound (Laps)")
-            print("-" * 58)  # Adjust the number of dashes based on the width of your table
-            for stint_number in range(1, int(max_stints) + 1):
-                actual_compound, actual_laps = self.get_actual_stint_info(actual_stint_data, stint_number)
-                if stint_number <= len(self.user_strategy):
-                    sim_compound, sim_laps = self.user_strategy[stint_number - 1]
-                else:
-                    sim_compound, sim_laps = ('N/A', 'N/A')
-                print(f"{stint_number:<5} | {actual_compound:<16} ({actual_laps:<3}) | {sim_compound:<16} ({sim_laps:<3})")
+        # Get actual stint and compound data for the driver for comparison, keyed by stint number.
+        # Uses the raw lap data, the categorical copy drops compounds a strategy can't use
+        stint_table = self.analysis.get_driver_stint_table(self.data_retriever.get_lap_data(), driver_code)
 
-            print(f"\nActual total race time for driver {driver_code}: {actual_race_time_str}")
-            print(f"Simulated total race time for driver {driver_code}: {total_simulated_time_str}")
+        num_sim_stints = len(self.user_strategy)
+        max_stints = int(max(max(stint_table, default=0), num_sim_stints))
 
-            time_difference = total_simulated_time - actual_race_time
-            time_difference_str = str(time_difference).split(' days ')[-1]
-            if time_difference > pd.Timedelta(0):
-                print(f"The simulated strategy is {time_difference_str} slower than the actual race time.\n")
+        # Format
+        actual_race_seconds = actual_race_time.total_seconds()
+        actual_race_time_str = format_seconds(actual_race_seconds)
+        total_simulated_time_str = format_seconds(total_simulated_seconds)
+
+        # Print the side by side comparison of stints
+        print("\nStint | Actual Compound (Laps) | Simulated Compound (Laps)")
+        print("-" * 58)  # Adjust the number of dashes based on the width of your table
+        for stint_number in range(1, max_stints + 1):
+            actual_compound, actual_laps = self.get_actual_stint_info(stint_table, stint_number)
+            if stint_number <= num_sim_stints:
+                sim_compound, sim_laps = self.user_strategy[stint_number - 1]
             else:
-                # When the simulated time is faster, time_difference will be negative, so multiply by -1 to make it positive before converting to string
-                faster_time_str = str(-time_difference).split(' days ')[-1]
-                print(f"The simulated strategy is {faster_time_str} faster than the actual race time.\n")
-
+                sim_compound, sim_laps = ('N/A', 'N/A')
+            print(f"{stint_number:<5} | {actual_compound:<16} ({actual_laps:<3}) | {sim_compound:<16} ({sim_laps:<3})")
+
+        print(f"\nActual total race time for driver {driver_code}: {actual_race_time_str}")
+        print(f"Simulated total race time for driver {driver_code}: {total_simulated_time_str} "
+              f"(+/- {spread_seconds:.3f}s over {race_totals.size} simulations)")
+
+        # Compare as float seconds rather than Timedelta arithmetic
+        difference_seconds = total_simulated_seconds - actual_race_seconds
+        if difference_seconds > 0:
+            time_difference_str = format_seconds(difference_seconds)
+            print(f"The simulated strategy is {time_difference_str} slower than the actual race time.\n")
         else:
-            print(f"No actual race time found for driver {driver_code}.")
+            # When the simulated time is faster, the difference will be negative, so multiply by -1 to make it positive before formatting
+            faster_time_str = format_seconds(-difference_seconds)
+            print(f"The simulated strategy is {faster_time_str} faster than the actual race time.\n")
 
     
-    def get_actual_stint_info(self, actual_stint_data, stint_number):
-        stint_info = actual_stint_data[actual_stint_data['Stint'] == stint_number]
-        if not stint_info.empty:
-            compound = stint_info.iloc[0]['Compound']
-            laps = stint_info.iloc[0]['StintLength']
-            return compound, laps
-        return 'N/A', 'N/A'
+    def get_actual_stint_info(self, stint_table, stint_number):
+        return stint_table.get(stint_number, ('N/A', 'N/A'))
     
 
     def get_drivers(self):
@@ -235,7 +331,11 @@ class RaceStrategySimulator:
             return
 
         self.input_strategy()
-        self.simulated_lap_times = self.simulate_lap_times(self.driver_code)
+        n_reps = self.input_num_simulations()
+        lap_matrix = self.simulate_lap_times_batch(self.driver_code, n_reps=n_reps)
+        self.simulated_race_times = lap_matrix.sum(axis=1)
+        # Keep a copy of the first replication as the lap by lap example, so the full matrix can be freed
+        self.simulated_lap_times = lap_matrix[0].copy() if lap_matrix.size else np.empty(0, dtype=np.float64)
         self.compare_strategy(self.driver_code)
             
 